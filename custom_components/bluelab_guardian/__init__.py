@@ -3,6 +3,7 @@ import time
 import os
 from functools import partial
 import asyncio
+from datetime import timedelta
 
 import aiofiles
 import requests
@@ -11,10 +12,32 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.event import async_track_time_interval
 
 from .const import DOMAIN, DEVICE_LIST_URL, TELEMETRY_URL, DEVICE_ATTRIBUTE_URL, CONF_API_TOKEN, \
-    TELEMETRY_UPDATE_INTERVAL, ATTRIBUTE_UPDATE_INTERVAL
+    TELEMETRY_UPDATE_INTERVAL, ATTRIBUTE_UPDATE_INTERVAL, CONF_TELEMETRY_INTERVAL, CONF_ATTRIBUTE_INTERVAL, \
+    CONF_MAX_CONCURRENCY, CONF_REQUESTS_PER_MINUTE, CONF_TELEMETRY_DEADBAND, CONF_VALUE_DEADBAND, \
+    DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TELEMETRY_DEADBAND, DEFAULT_VALUE_DEADBAND, \
+    PREFETCH_DATA, REQUEST_TIMEOUT
+from .ingest import apply_device_attributes, apply_device_telemetry
+from .profiling import async_profile_sweep, record_response
+from .services import async_setup_services, async_unload_services
+from .throttle import RequestThrottle
 
 _LOGGER = logging.getLogger(__name__)
 
+PLATFORMS = ["sensor", "binary_sensor", "number", "switch"]
+
+
+def get_options(entry: ConfigEntry) -> dict:
+    """Return the entry's tuning options with defaults filled in."""
+    return {
+        CONF_TELEMETRY_INTERVAL: TELEMETRY_UPDATE_INTERVAL.total_seconds(),
+        CONF_ATTRIBUTE_INTERVAL: ATTRIBUTE_UPDATE_INTERVAL.total_seconds(),
+        CONF_MAX_CONCURRENCY: DEFAULT_MAX_CONCURRENCY,
+        CONF_REQUESTS_PER_MINUTE: DEFAULT_REQUESTS_PER_MINUTE,
+        CONF_TELEMETRY_DEADBAND: DEFAULT_TELEMETRY_DEADBAND,
+        CONF_VALUE_DEADBAND: DEFAULT_VALUE_DEADBAND,
+        **entry.options,
+    }
+
 
 async def copy_static_files(hass: HomeAssistant):
     """Copy static assets to the www directory."""
@@ -49,44 +72,120 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Copy static files on setup
     await copy_static_files(hass)
 
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {}
-
     api_token = entry.data[CONF_API_TOKEN]
     organization_id = entry.data.get("organization_id")
     headers = {"Authorization": api_token}
 
-    device_list_url = f"{DEVICE_LIST_URL}{organization_id}"
-    try:
-        # Use partial to pass headers properly
-        response = await hass.async_add_executor_job(
-            partial(requests.get, device_list_url, headers=headers)
-        )
-        response.raise_for_status()
-        devices = response.json()
-        _LOGGER.info("Devices fetched: %s", devices)
-        # Log device structure for debugging
-        for device in devices:
-            _LOGGER.debug("Device structure: %s", device)
+    # Reuse the device list and attributes the config flow fetched while validating
+    prefetched = hass.data.get(PREFETCH_DATA, {}).pop(organization_id, None)
+
+    hass.data.setdefault(DOMAIN, {})
+    options = get_options(entry)
+    if prefetched is not None:
+        # Keep the config flow's request history so its requests count against the budget
+        throttle = prefetched["throttle"]
+        await throttle.configure(options[CONF_MAX_CONCURRENCY], options[CONF_REQUESTS_PER_MINUTE])
+    else:
+        throttle = RequestThrottle(options[CONF_MAX_CONCURRENCY], options[CONF_REQUESTS_PER_MINUTE])
+    hass.data[DOMAIN][entry.entry_id] = {
+        # Shared with the entities, updated in place when the options change
+        "options": options,
+        "throttle": throttle,
+    }
+
+    if prefetched is not None:
+        devices = prefetched["devices"]
+        _LOGGER.info("Using devices prefetched by the config flow: %s", devices)
         hass.data[DOMAIN][entry.entry_id]["devices"] = devices
-    except requests.RequestException as err:
-        _LOGGER.error("Failed to fetch devices: %s", err)
-        return False
+    else:
+        device_list_url = f"{DEVICE_LIST_URL}{organization_id}"
+        try:
+            # Use partial to pass headers properly
+            response = await hass.async_add_executor_job(
+                partial(requests.get, device_list_url, headers=headers, timeout=REQUEST_TIMEOUT)
+            )
+            response.raise_for_status()
+            devices = response.json()
+            _LOGGER.info("Devices fetched: %s", devices)
+            # Log device structure for debugging
+            for device in devices:
+                _LOGGER.debug("Device structure: %s", device)
+            hass.data[DOMAIN][entry.entry_id]["devices"] = devices
+        except requests.RequestException as err:
+            _LOGGER.error("Failed to fetch devices: %s", err)
+            return False
 
     # Track entities for telemetry and attributes
     hass.data[DOMAIN][entry.entry_id]["telemetry_entities"] = []  # For sensor entities
     hass.data[DOMAIN][entry.entry_id]["attribute_entities"] = []  # For number entities
     # Track last telemetry fetch time per device
     hass.data[DOMAIN][entry.entry_id]["last_telemetry_fetch"] = {}
+    # Sweeps ("telemetry", "attributes") that are still running
+    hass.data[DOMAIN][entry.entry_id]["sweeps_in_flight"] = set()
 
     # Forward entry setup to sensor, binary_sensor, and number platforms
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor", "binary_sensor", "number", "switch"])
-
-    # Trigger initial attribute update only (not telemetry, as it needs time)
-    await async_update_device_attributes(hass, entry)  # Immediate attributes update
-    # Skip initial telemetry update to avoid the 1-minute rate limit
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Apply attributes the config flow already fetched, the rest is refreshed in the background
+    if prefetched is not None:
+        for device_id, attributes_data in prefetched["attributes"].items():
+            apply_device_attributes(hass.data[DOMAIN][entry.entry_id], device_id, attributes_data)
+
+    entry.async_create_background_task(
+        hass,
+        async_initial_refresh(
+            hass,
+            entry,
+            # Only fetch attributes the config flow could not prefetch
+            attribute_device_ids=None if prefetched is None else [
+                device["id"] for device in devices if device["id"] not in prefetched["attributes"]
+            ],
+        ),
+        f"{DOMAIN}_initial_refresh",
+    )
 
     # Schedule telemetry and attribute updates with event-loop-safe scheduling
+    async_schedule_updates(hass, entry)
+    entry.async_on_unload(_async_cancel_updates(hass.data[DOMAIN][entry.entry_id]))
+
+    # Apply option changes to the running scheduler instead of reloading the entry
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+
+    async_setup_services(hass)
+
+    return True
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload a Bluelab Guardian config entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id)
+        if not hass.data[DOMAIN]:
+            await async_unload_services(hass)
+    return unload_ok
+
+
+async def async_initial_refresh(hass: HomeAssistant, entry: ConfigEntry, attribute_device_ids=None):
+    """Fetch the first telemetry and attributes concurrently without holding up setup.
+
+    Attributes are fetched for ``attribute_device_ids``, or for all devices if None.
+    Entities stay unavailable until their first data arrives.
+    """
+    updates = [async_update_telemetry(hass, entry)]
+    if attribute_device_ids is None or attribute_device_ids:
+        updates.append(async_update_device_attributes(hass, entry, attribute_device_ids))
+    await asyncio.gather(*updates)
+
+
+def async_schedule_updates(hass: HomeAssistant, entry: ConfigEntry):
+    """(Re)start the telemetry and attribute polling timers using the current options."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    options = entry_data["options"]
+
+    for unsub in entry_data.pop("unsub_timers", []):
+        unsub()
+
     async def schedule_telemetry_update(now):
         await async_update_telemetry(hass, entry)
 
@@ -94,105 +193,169 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         await async_update_device_attributes(hass, entry)
 
     # Use event-loop-safe scheduling
-    async_track_time_interval(hass, schedule_telemetry_update, TELEMETRY_UPDATE_INTERVAL)
-    async_track_time_interval(hass, schedule_attribute_update, ATTRIBUTE_UPDATE_INTERVAL)
+    entry_data["unsub_timers"] = [
+        async_track_time_interval(
+            hass, schedule_telemetry_update, timedelta(seconds=options[CONF_TELEMETRY_INTERVAL])
+        ),
+        async_track_time_interval(
+            hass, schedule_attribute_update, timedelta(seconds=options[CONF_ATTRIBUTE_INTERVAL])
+        ),
+    ]
+
+
+def _async_cancel_updates(entry_data):
+    """Return a callback that stops the polling timers of an entry."""
+    # Holds on to entry_data, async_unload_entry removes it from hass.data before this runs
+    def cancel():
+        for unsub in entry_data.pop("unsub_timers", []):
+            unsub()
+
+    return cancel
 
-    return True
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """Apply changed options to the running scheduler without recreating entities."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    options = entry_data["options"]
+    old_intervals = (options[CONF_TELEMETRY_INTERVAL], options[CONF_ATTRIBUTE_INTERVAL])
+
+    options.update(get_options(entry))
+    _LOGGER.debug("Applying options: %s", options)
+
+    await entry_data["throttle"].configure(options[CONF_MAX_CONCURRENCY], options[CONF_REQUESTS_PER_MINUTE])
+
+    if (options[CONF_TELEMETRY_INTERVAL], options[CONF_ATTRIBUTE_INTERVAL]) != old_intervals:
+        async_schedule_updates(hass, entry)
 
 
 async def async_update_telemetry(hass: HomeAssistant, entry: ConfigEntry):
     """Fetch and update telemetry data for all devices."""
     _LOGGER.debug("Starting telemetry update...")
-    api_token = entry.data[CONF_API_TOKEN]
-    headers = {"Authorization": api_token}
-    devices = hass.data[DOMAIN][entry.entry_id].get("devices", [])
-    last_telemetry_fetch = hass.data[DOMAIN][entry.entry_id].get("last_telemetry_fetch", {})
-    
-    # Track successful updates
-    successful_updates = 0
-    failed_updates = 0
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    devices = entry_data.get("devices", [])
     current_time = time.time()
 
-    for device in devices:
-        device_id = device["id"]
-        
-        # Check if we've fetched telemetry for this device recently
-        last_fetch = last_telemetry_fetch.get(device_id, 0)
-        time_since_last_fetch = current_time - last_fetch
-        
-        # Skip if we fetched less than 60 seconds ago
-        if time_since_last_fetch < 60:
-            _LOGGER.debug("Skipping telemetry for device %s (fetched %.1f seconds ago)", device_id, time_since_last_fetch)
-            continue
-            
-        telemetry_url = f"{TELEMETRY_URL}{device_id}"
-        _LOGGER.debug("Fetching telemetry for device %s from URL: %s", device_id, telemetry_url)
+    # Don't queue a new sweep behind one that is still waiting on the throttle
+    if "telemetry" in entry_data["sweeps_in_flight"]:
+        _LOGGER.debug("Skipping telemetry update, the previous one is still running")
+        return
+    entry_data["sweeps_in_flight"].add("telemetry")
 
-        try:
-            # Try without params first to see if that's causing the 400 error
+    # Fetch devices concurrently, the throttle keeps us within the API budget
+    try:
+        async with async_profile_sweep(hass):
+            results = await asyncio.gather(
+                *(_async_update_device_telemetry(hass, entry, device["id"], current_time) for device in devices)
+            )
+    finally:
+        entry_data["sweeps_in_flight"].discard("telemetry")
+
+    successful_updates = results.count(True)
+    failed_updates = results.count(False)
+    _LOGGER.debug("Telemetry update complete. Successful: %d, Failed: %d", successful_updates, failed_updates)
+
+
+async def _async_update_device_telemetry(hass: HomeAssistant, entry: ConfigEntry, device_id, current_time):
+    """Fetch telemetry for one device and apply it to its sensors.
+
+    Returns True on success, False on failure and None if the device was skipped.
+    """
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    headers = {"Authorization": entry.data[CONF_API_TOKEN]}
+    last_telemetry_fetch = entry_data.get("last_telemetry_fetch", {})
+    telemetry_deadband = entry_data["options"][CONF_TELEMETRY_DEADBAND]
+
+    # Check if we've fetched telemetry for this device recently
+    last_fetch = last_telemetry_fetch.get(device_id, 0)
+    time_since_last_fetch = current_time - last_fetch
+
+    # Skip if we fetched within the deadband
+    if time_since_last_fetch < telemetry_deadband:
+        _LOGGER.debug("Skipping telemetry for device %s (fetched %.1f seconds ago)", device_id, time_since_last_fetch)
+        return None
+
+    telemetry_url = f"{TELEMETRY_URL}{device_id}"
+    _LOGGER.debug("Fetching telemetry for device %s from URL: %s", device_id, telemetry_url)
+
+    try:
+        async with entry_data["throttle"].slot():
+            # Count the fetch from the moment the request is sent
+            last_telemetry_fetch[device_id] = time.time()
+            started = time.monotonic()
             response = await hass.async_add_executor_job(
-                partial(requests.get, telemetry_url, headers=headers)
+                partial(requests.get, telemetry_url, headers=headers, timeout=REQUEST_TIMEOUT)
             )
-            response.raise_for_status()
-            telemetry_data = response.json()
-            _LOGGER.debug("Telemetry data for device %s: %s", device_id, telemetry_data)
-            
-            # Update last fetch time
-            last_telemetry_fetch[device_id] = current_time
-            
-            # Apply telemetry updates to all sensor entities
-            updated_entities = 0
-            for entity in hass.data[DOMAIN][entry.entry_id]["telemetry_entities"]:
-                if entity.device_id == device_id:
-                    entity.update_telemetry(telemetry_data)
-                    updated_entities += 1
-            
-            _LOGGER.debug("Updated %d entities for device %s", updated_entities, device_id)
-            successful_updates += 1
-            
-            # Add a delay between devices to avoid hitting rate limits
-            if len(devices) > 1:
-                await asyncio.sleep(5)  # 5 second delay between device fetches
-            
-        except requests.RequestException as err:
-            failed_updates += 1
-            if hasattr(err, 'response') and err.response is not None:
-                if err.response.status_code == 400:
-                    # This might be a device that doesn't support telemetry
-                    _LOGGER.debug("Device %s may not support telemetry (400 error)", device_id)
-                else:
-                    _LOGGER.warning("Failed to fetch telemetry for device %s: %s", device_id, err)
-                _LOGGER.debug("Response status: %s, Response text: %s", err.response.status_code, err.response.text)
+        elapsed = time.monotonic() - started
+        if not response.ok:
+            record_response(hass, "telemetry", device_id, response, elapsed)
+        response.raise_for_status()
+        telemetry_data = response.json()
+        record_response(hass, "telemetry", device_id, response, elapsed, telemetry_data)
+        _LOGGER.debug("Telemetry data for device %s: %s", device_id, telemetry_data)
+
+        # Apply telemetry updates to all sensor entities
+        updated_entities = apply_device_telemetry(entry_data, device_id, telemetry_data)
+
+        _LOGGER.debug("Updated %d entities for device %s", updated_entities, device_id)
+        return True
+
+    except requests.RequestException as err:
+        if hasattr(err, 'response') and err.response is not None:
+            if err.response.status_code == 400:
+                # This might be a device that doesn't support telemetry
+                _LOGGER.debug("Device %s may not support telemetry (400 error)", device_id)
             else:
                 _LOGGER.warning("Failed to fetch telemetry for device %s: %s", device_id, err)
-    
-    _LOGGER.debug("Telemetry update complete. Successful: %d, Failed: %d", successful_updates, failed_updates)
+            _LOGGER.debug("Response status: %s, Response text: %s", err.response.status_code, err.response.text)
+        else:
+            _LOGGER.warning("Failed to fetch telemetry for device %s: %s", device_id, err)
+        return False
 
 
-async def async_update_device_attributes(hass: HomeAssistant, entry: ConfigEntry):
-    """Fetch and update device attributes for all devices."""
+async def async_update_device_attributes(hass: HomeAssistant, entry: ConfigEntry, device_ids=None):
+    """Fetch and update device attributes for the given devices, or all devices if None."""
     _LOGGER.debug("Starting device attribute update...")
-    api_token = entry.data[CONF_API_TOKEN]
-    headers = {"Authorization": api_token}
-    devices = hass.data[DOMAIN][entry.entry_id].get("devices", [])
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    if device_ids is None:
+        device_ids = [device["id"] for device in entry_data.get("devices", [])]
 
-    for device in devices:
-        device_id = device["id"]
-        attributes_url = f"{DEVICE_ATTRIBUTE_URL}{device_id}"
+    # Don't queue a new sweep behind one that is still waiting on the throttle
+    if "attributes" in entry_data["sweeps_in_flight"]:
+        _LOGGER.debug("Skipping device attribute update, the previous one is still running")
+        return
+    entry_data["sweeps_in_flight"].add("attributes")
 
-        try:
-            # Use partial to pass headers properly
+    try:
+        async with async_profile_sweep(hass):
+            await asyncio.gather(
+                *(_async_update_device_attributes(hass, entry, device_id) for device_id in device_ids)
+            )
+    finally:
+        entry_data["sweeps_in_flight"].discard("attributes")
+
+
+async def _async_update_device_attributes(hass: HomeAssistant, entry: ConfigEntry, device_id):
+    """Fetch attributes for one device and apply them to its entities."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    headers = {"Authorization": entry.data[CONF_API_TOKEN]}
+    attributes_url = f"{DEVICE_ATTRIBUTE_URL}{device_id}"
+
+    try:
+        # Use partial to pass headers properly
+        async with entry_data["throttle"].slot():
+            started = time.monotonic()
             response = await hass.async_add_executor_job(
-                partial(requests.get, attributes_url, headers=headers)
+                partial(requests.get, attributes_url, headers=headers, timeout=REQUEST_TIMEOUT)
             )
-            response.raise_for_status()
-            attributes_data = response.json()
-            _LOGGER.debug("Attributes data for device %s: %s", device_id, attributes_data)
-
-            # Apply attribute updates to all entities
-            for entity in hass.data[DOMAIN][entry.entry_id]["attribute_entities"]:
-                if entity.device_id == device_id:
-                    _LOGGER.debug(f"device_id: {device_id}")
-                    entity.update_attributes(attributes_data)
-        except requests.RequestException as err:
-            _LOGGER.info("Failed to fetch attributes for device %s: %s", device_id, err)
+        elapsed = time.monotonic() - started
+        if not response.ok:
+            record_response(hass, "attributes", device_id, response, elapsed)
+        response.raise_for_status()
+        attributes_data = response.json()
+        record_response(hass, "attributes", device_id, response, elapsed, attributes_data)
+        _LOGGER.debug("Attributes data for device %s: %s", device_id, attributes_data)
+
+        apply_device_attributes(entry_data, device_id, attributes_data)
+    except requests.RequestException as err:
+        _LOGGER.info("Failed to fetch attributes for device %s: %s", device_id, err)
+
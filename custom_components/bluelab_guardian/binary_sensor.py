@@ -26,7 +26,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
         # REMOVE ALARM ENABLED FROM HERE
         # Previously, a binary sensor was created for "alarm_enabled", but we no longer want this.
 
-    hass.data[DOMAIN][entry.entry_id]["attribute_entities"] = entities
+    hass.data[DOMAIN][entry.entry_id]["attribute_entities"].extend(entities)
     async_add_entities(entities, update_before_add=True)
     
     
@@ -39,7 +39,7 @@ class BluelabGuardianAlarmBinarySensor(BinarySensorEntity):
         self._name = f"{device['label']} {alarm_type.replace('_', ' ').capitalize()}"
         self.alarm_type = alarm_type
         self.api_token = api_token
-        self._state = 0
+        self._state = None
         self._device_name = device["label"]
 
     @property
@@ -50,6 +50,11 @@ class BluelabGuardianAlarmBinarySensor(BinarySensorEntity):
     def is_on(self):
         return self._state
 
+    @property
+    def available(self):
+        """Return False until the first data has been received."""
+        return self._state is not None
+
     @property
     def name(self):
         return self._name
@@ -75,16 +80,21 @@ class BluelabGuardianAlarmBinarySensor(BinarySensorEntity):
         return "mdi:eye"
 
     def update_attributes(self, attributes_data):
-        """Update binary sensor state based on device attributes."""
+        """Update binary sensor state based on device attributes.
+
+        Returns True if the state changed and needs to be written.
+        """
+        changed = False
         for attribute in attributes_data:
             if attribute["key"] == f"alarm.{self.alarm_type}":
                 new_state = attribute["value"]
                 if new_state != self._state:
                     _LOGGER.debug("Updating state of %s from %s to %s", self.name, self._state, new_state)
                     self._state = new_state
-                    self.async_write_ha_state()
+                    changed = True
                 else:
                     _LOGGER.debug("State of %s remains unchanged at %s", self.name, self._state)
+        return changed
 
 
 class BluelabGuardianAlarmSettingBinarySensor(BinarySensorEntity):
@@ -126,11 +136,16 @@ class BluelabGuardianAlarmSettingBinarySensor(BinarySensorEntity):
         return "mdi:bell-ring" if self._state else "mdi:bell-off"
 
     def update_attributes(self, attributes_data):
-        """Update the state based on the fetched attributes."""
+        """Update the state based on the fetched attributes.
+
+        Returns True if the state changed and needs to be written.
+        """
+        changed = False
         for attribute in attributes_data:
             if attribute["key"] == "setting.alarms":
                 new_state = attribute["value"]
                 if new_state != self._state:
                     _LOGGER.debug("Updating %s state from %s to %s", self.name, self._state, new_state)
                     self._state = new_state
-                    self.async_write_ha_state()
+                    changed = True
+        return changed
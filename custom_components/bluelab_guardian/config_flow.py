@@ -1,7 +1,33 @@
+import asyncio
+import logging
+
+import aiohttp
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_API_TOKEN
-from .const import DOMAIN, CONF_ORGANIZATION_ID
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from .const import DOMAIN, CONF_ORGANIZATION_ID, CONF_TELEMETRY_INTERVAL, CONF_ATTRIBUTE_INTERVAL, \
+    CONF_MAX_CONCURRENCY, CONF_REQUESTS_PER_MINUTE, CONF_TELEMETRY_DEADBAND, CONF_VALUE_DEADBAND, \
+    TELEMETRY_UPDATE_INTERVAL, ATTRIBUTE_UPDATE_INTERVAL, DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE, \
+    DEFAULT_TELEMETRY_DEADBAND, DEFAULT_VALUE_DEADBAND, DEVICE_LIST_URL, DEVICE_ATTRIBUTE_URL, PREFETCH_DATA
+from .throttle import RequestThrottle
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Upper bounds for the requests made while the user waits on the form
+VALIDATION_TIMEOUT = 30  # seconds
+PREFETCH_TIMEOUT = 30  # seconds
+
+
+class InvalidAuth(Exception):
+    """Raised when the API rejects the token or organization ID."""
+
+
+class InvalidResponse(Exception):
+    """Raised when the device list is not in the expected format."""
+
 
 class BluelabGuardianConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Bluelab Guardian integration."""
@@ -9,15 +35,124 @@ class BluelabGuardianConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_CLOUD_POLL
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return BluelabGuardianOptionsFlow()
+
     async def async_step_user(self, user_input=None):
+        errors = {}
         if user_input is not None:
-            # Save both api_token and organization_id
-            return self.async_create_entry(title="Bluelab Guardian", data=user_input)
+            organization_id = user_input[CONF_ORGANIZATION_ID]
+            await self.async_set_unique_id(organization_id)
+            self._abort_if_unique_id_configured()
+
+            try:
+                prefetched = await self._async_prefetch(organization_id, user_input[CONF_API_TOKEN])
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
+            except InvalidResponse as err:
+                _LOGGER.error("Unexpected device list from the Bluelab API: %s", err)
+                errors["base"] = "invalid_response"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.error("Failed to connect to the Bluelab API: %s", err)
+                errors["base"] = "cannot_connect"
+            else:
+                # Hand the fetched data to async_setup_entry so it does not repeat these requests
+                self.hass.data.setdefault(PREFETCH_DATA, {})[organization_id] = prefetched
+                # Save both api_token and organization_id
+                return self.async_create_entry(title="Bluelab Guardian", data=user_input)
 
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema({
                 vol.Required(CONF_ORGANIZATION_ID): str,
                 vol.Required(CONF_API_TOKEN): str
+            }),
+            errors=errors,
+        )
+
+    async def _async_prefetch(self, organization_id, api_token):
+        """Validate the credentials and fetch the device list and initial attributes.
+
+        The throttle is handed to async_setup_entry along with the data, so the
+        requests made here count against the entry's per-minute budget.
+        """
+        session = async_get_clientsession(self.hass)
+        headers = {"Authorization": api_token}
+        throttle = RequestThrottle(DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE)
+
+        async with asyncio.timeout(VALIDATION_TIMEOUT), throttle.slot():
+            async with session.get(f"{DEVICE_LIST_URL}{organization_id}", headers=headers) as response:
+                if response.status in (401, 403, 404):
+                    raise InvalidAuth
+                response.raise_for_status()
+                try:
+                    devices = await response.json()
+                except ValueError as err:
+                    raise InvalidResponse(err) from err
+
+        if not isinstance(devices, list) or not all(isinstance(device, dict) and "id" in device for device in devices):
+            raise InvalidResponse(devices)
+
+        async def fetch_attributes(device_id):
+            try:
+                async with throttle.slot():
+                    async with session.get(f"{DEVICE_ATTRIBUTE_URL}{device_id}", headers=headers) as response:
+                        response.raise_for_status()
+                        return device_id, await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+                # The initial refresh after setup will pick this device up
+                _LOGGER.info("Failed to prefetch attributes for device %s: %s", device_id, err)
+                return device_id, None
+
+        # Devices still waiting on the throttle when time runs out are left to the initial refresh
+        tasks = [asyncio.create_task(fetch_attributes(device["id"])) for device in devices]
+        done, pending = await asyncio.wait(tasks, timeout=PREFETCH_TIMEOUT) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        results = [task.result() for task in done]
+        attributes = {device_id: data for device_id, data in results if data is not None}
+
+        return {"devices": devices, "attributes": attributes, "throttle": throttle}
+
+
+class BluelabGuardianOptionsFlow(config_entries.OptionsFlow):
+    """Handle polling and rate limit options for Bluelab Guardian."""
+
+    async def async_step_init(self, user_input=None):
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_TELEMETRY_INTERVAL,
+                    default=options.get(CONF_TELEMETRY_INTERVAL, int(TELEMETRY_UPDATE_INTERVAL.total_seconds())),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10)),
+                vol.Required(
+                    CONF_ATTRIBUTE_INTERVAL,
+                    default=options.get(CONF_ATTRIBUTE_INTERVAL, int(ATTRIBUTE_UPDATE_INTERVAL.total_seconds())),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10)),
+                vol.Required(
+                    CONF_MAX_CONCURRENCY,
+                    default=options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                vol.Required(
+                    CONF_REQUESTS_PER_MINUTE,
+                    default=options.get(CONF_REQUESTS_PER_MINUTE, DEFAULT_REQUESTS_PER_MINUTE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Required(
+                    CONF_TELEMETRY_DEADBAND,
+                    default=options.get(CONF_TELEMETRY_DEADBAND, DEFAULT_TELEMETRY_DEADBAND),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_VALUE_DEADBAND,
+                    default=options.get(CONF_VALUE_DEADBAND, DEFAULT_VALUE_DEADBAND),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
             })
         )
@@ -6,5 +6,44 @@ CONF_ORGANIZATION_ID = "organization_id"
 DEVICE_LIST_URL = "https://api.edenic.io/api/v1/device/"
 TELEMETRY_URL = "https://api.edenic.io/api/v1/telemetry/"
 DEVICE_ATTRIBUTE_URL = "https://api.edenic.io/api/v1/device-attribute/"
+THRESHOLD_SETTINGS = [
+    "ph_low_alarm",
+    "ph_high_alarm",
+    "ec_low_alarm",
+    "ec_high_alarm",
+    "temp_low_alarm",
+    "temp_high_alarm",
+]
 TELEMETRY_UPDATE_INTERVAL = timedelta(seconds=70)
 ATTRIBUTE_UPDATE_INTERVAL = timedelta(seconds=70)
+REQUEST_TIMEOUT = 30  # seconds, so a hung request cannot stall a sweep and hold a throttle slot
+
+# Options (tunable at runtime from the integration's options flow)
+CONF_TELEMETRY_INTERVAL = "telemetry_interval"
+CONF_ATTRIBUTE_INTERVAL = "attribute_interval"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_REQUESTS_PER_MINUTE = "requests_per_minute"
+CONF_TELEMETRY_DEADBAND = "telemetry_deadband"
+CONF_VALUE_DEADBAND = "value_deadband"
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_TELEMETRY_DEADBAND = 60  # seconds, the API only serves one telemetry request per minute
+DEFAULT_VALUE_DEADBAND = 0.0
+
+# Devices, attributes and request throttle from the config flow, keyed by organization ID
+PREFETCH_DATA = f"{DOMAIN}_prefetch"
+
+SERVICE_SET_THRESHOLDS = "set_thresholds"
+ATTR_THRESHOLDS = "thresholds"
+
+# Active profiler and traffic recorder, shared by all config entries
+PROFILING_DATA = f"{DOMAIN}_profiling"
+
+SERVICE_PROFILE = "profile"
+SERVICE_START_RECORDING = "start_recording"
+SERVICE_STOP_RECORDING = "stop_recording"
+SERVICE_REPLAY = "replay"
+ATTR_SWEEPS = "sweeps"
+ATTR_FILENAME = "filename"
+ATTR_SPEED = "speed"
@@ -0,0 +1,38 @@
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def apply_device_telemetry(entry_data, device_id, telemetry_data):
+    """Apply telemetry to all sensors of a device and publish the changes in one batch.
+
+    Returns the number of entities whose state changed.
+    """
+    changed_entities = [
+        entity for entity in entry_data["telemetry_entities"]
+        if entity.device_id == device_id and entity.update_telemetry(telemetry_data)
+    ]
+    async_write_states(changed_entities)
+    return len(changed_entities)
+
+
+def apply_device_attributes(entry_data, device_id, attributes_data):
+    """Apply attribute updates to all entities of a device and publish the changes in one batch."""
+    _LOGGER.debug(f"device_id: {device_id}")
+    changed_entities = [
+        entity for entity in entry_data["attribute_entities"]
+        if entity.device_id == device_id and entity.update_attributes(attributes_data)
+    ]
+    async_write_states(changed_entities)
+
+
+def async_write_states(entities):
+    """Write the state of each changed entity.
+
+    Entities only record their new state while a device response is processed,
+    so a sweep produces at most one state write per entity.
+    """
+    for entity in entities:
+        # Skip entities that have not been added to Home Assistant (yet)
+        if entity.entity_id is not None:
+            entity.async_write_ha_state()
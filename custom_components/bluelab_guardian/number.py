@@ -3,7 +3,7 @@ import logging
 import aiohttp
 from homeassistant.components.number import NumberEntity
 
-from .const import DOMAIN, DEVICE_ATTRIBUTE_URL
+from .const import DOMAIN, DEVICE_ATTRIBUTE_URL, THRESHOLD_SETTINGS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,14 +15,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
 
     entities = []
     for device in devices:
-        for setting in [
-            "ph_low_alarm",
-            "ph_high_alarm",
-            "ec_low_alarm",
-            "ec_high_alarm",
-            "temp_low_alarm",
-            "temp_high_alarm",
-        ]:
+        for setting in THRESHOLD_SETTINGS:
             entity = BluelabGuardianNumber(hass, device, setting, api_token)
             entities.append(entity)
 
@@ -38,7 +31,7 @@ class BluelabGuardianNumber(NumberEntity):
     def __init__(self, hass, device, setting, api_token):
         """Initialize the number entity."""
         self.hass = hass
-        self._state = 0
+        self._state = None
         self.device_id = device["id"]
         self.setting = setting
         self.api_token = api_token
@@ -59,6 +52,11 @@ class BluelabGuardianNumber(NumberEntity):
         """Return the current value of the threshold."""
         return self._state
 
+    @property
+    def available(self):
+        """Return False until the first data has been received."""
+        return self._state is not None
+
     @property
     def native_min_value(self):
         """Return the minimum value for the threshold."""
@@ -102,7 +100,11 @@ class BluelabGuardianNumber(NumberEntity):
         # await self.hass.async_add_executor_job(requests.post, url, json=payload, headers=headers)
 
     def update_attributes(self, attributes_data):
-        """Update the state of the numeric threshold based on attributes."""
+        """Update the state of the numeric threshold based on attributes.
+
+        Returns True if the state changed and needs to be written.
+        """
+        changed = False
         for attribute in attributes_data:
             if attribute["key"] == f"setting.{self.setting}":  # Match the specific setting key
                 try:
@@ -113,10 +115,21 @@ class BluelabGuardianNumber(NumberEntity):
                     if new_state != self._state:
                         _LOGGER.debug("Updating state of %s from %s to %s", self.name, self._state, new_state)
                         self._state = new_state
-                        self.async_write_ha_state()
+                        changed = True
                 except (ValueError, TypeError, KeyError) as e:
                     # _LOGGER.error("Error updating %s: %s", self.name, e)
-                    _LOGGER.debug(f"Error updating: name: {self.name}, state: {self._state}, new_state: {new_state}")
+                    _LOGGER.debug(f"Error updating: name: {self.name}, state: {self._state}, error: {e}")
+        return changed
+
+    def apply_threshold(self, value):
+        """Set the threshold to a value already written to the device.
+
+        Returns True if the state changed and needs to be written.
+        """
+        if value == self._state:
+            return False
+        self._state = value
+        return True
 
     async def _send_command(self, state):
         # Access the top-level domain data dynamically
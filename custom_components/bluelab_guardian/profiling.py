@@ -0,0 +1,169 @@
+import asyncio
+import cProfile
+import gzip
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from homeassistant.core import HomeAssistant
+
+from .const import PROFILING_DATA
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SweepProfiler:
+    """Profile the event loop while poll sweeps run, for a fixed number of sweeps.
+
+    Only code running on the event loop is captured. The blocking HTTP requests
+    run in executor threads and do not show up in the profile.
+    """
+
+    def __init__(self, sweeps, path):
+        self.path = path
+        self._remaining = sweeps
+        self._active = 0
+        self._profile = cProfile.Profile()
+
+    def begin(self):
+        """Start profiling a sweep, sweeps may overlap.
+
+        Raises ValueError if another profiler is already active.
+        """
+        if self._active == 0:
+            self._profile.enable()
+        self._active += 1
+
+    def cancel(self):
+        """Stop profiling without writing a profile."""
+        self._profile.disable()
+
+    async def async_end(self, hass: HomeAssistant):
+        """Stop profiling a sweep and write the profile once all sweeps are done."""
+        self._active -= 1
+        self._remaining -= 1
+        if self._active > 0:
+            return
+        self._profile.disable()
+
+        if self._remaining <= 0 and hass.data.get(PROFILING_DATA, {}).get("profiler") is self:
+            hass.data[PROFILING_DATA]["profiler"] = None
+            await hass.async_add_executor_job(self._profile.dump_stats, self.path)
+            _LOGGER.info("Wrote poll profile to %s", self.path)
+
+
+@asynccontextmanager
+async def async_profile_sweep(hass: HomeAssistant):
+    """Profile the enclosed poll sweep if profiling has been requested."""
+    profiler = hass.data.get(PROFILING_DATA, {}).get("profiler")
+    if profiler is None:
+        yield
+        return
+
+    try:
+        profiler.begin()
+    except ValueError as err:
+        # Python 3.12+ allows one profiler at a time, e.g. HA's profiler integration may be running
+        _LOGGER.error("Could not start profiling, dropping the profile request: %s", err)
+        if hass.data.get(PROFILING_DATA, {}).get("profiler") is profiler:
+            hass.data[PROFILING_DATA]["profiler"] = None
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        await profiler.async_end(hass)
+
+
+class TrafficRecorder:
+    """Stream raw API responses with timing to a gzipped JSON lines file.
+
+    Records are written in small batches from the executor, so a long
+    recording does not accumulate in memory.
+    """
+
+    FLUSH_EVERY = 50
+
+    def __init__(self, hass: HomeAssistant, path):
+        self.hass = hass
+        self.path = path
+        self.records = 0
+        self._start = time.monotonic()
+        self._buffer = []
+        self._lock = asyncio.Lock()
+        self._flushes = set()
+
+    async def async_start(self):
+        """Create (or truncate) the recording file."""
+        await self.hass.async_add_executor_job(self._write, [], "wt")
+
+    def record(self, kind, device_id, status, elapsed, data):
+        """Store one response; ``data`` is None if the body could not be decoded."""
+        self._buffer.append({
+            "t": round(time.monotonic() - self._start, 3),
+            "kind": kind,
+            "device_id": device_id,
+            "status": status,
+            "elapsed": round(elapsed, 3),
+            "data": data,
+        })
+        self.records += 1
+        if len(self._buffer) >= self.FLUSH_EVERY:
+            self._schedule_flush()
+
+    async def async_stop(self):
+        """Write the remaining records and return the total number of records."""
+        self._schedule_flush()
+        await asyncio.gather(*self._flushes)
+        return self.records
+
+    def _schedule_flush(self):
+        batch, self._buffer = self._buffer, []
+        task = self.hass.async_create_task(self._async_flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _async_flush(self, batch):
+        # The lock is fair, so batches are appended in the order they were taken
+        async with self._lock:
+            await self.hass.async_add_executor_job(self._write, batch, "at")
+
+    def _write(self, batch, mode):
+        with gzip.open(self.path, mode, encoding="utf-8") as file:
+            for record in batch:
+                file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def record_response(hass: HomeAssistant, kind, device_id, response, elapsed, data=None):
+    """Pass a response to the active traffic recorder, if any."""
+    recorder = hass.data.get(PROFILING_DATA, {}).get("recorder")
+    if recorder is not None:
+        recorder.record(kind, device_id, response.status_code, elapsed, data)
+
+
+def load_recording(path):
+    """Read a recording written by TrafficRecorder."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+async def async_replay(records, speed, ingest):
+    """Feed recorded responses to ``ingest(kind, device_id, data)``.
+
+    Recorded gaps are kept at ``speed`` 1, shortened at higher speeds and
+    skipped entirely at speed 0. Returns the number of responses replayed.
+    """
+    replayed = 0
+    previous = 0
+    for record in records:
+        # Always yield to the event loop, even when replaying without delays
+        delay = (record["t"] - previous) / speed if speed > 0 else 0
+        await asyncio.sleep(max(delay, 0))
+        previous = record["t"]
+
+        if record["data"] is not None:
+            ingest(record["kind"], record["device_id"], record["data"])
+            replayed += 1
+    return replayed
@@ -1,7 +1,7 @@
 import logging
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
-from .const import DOMAIN
+from .const import DOMAIN, CONF_VALUE_DEADBAND
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -9,11 +9,12 @@ async def async_setup_entry(hass, entry, async_add_entities):
     """Set up Bluelab Guardian sensors based on a config entry."""
     devices = hass.data[DOMAIN][entry.entry_id]["devices"]
     api_token = entry.data["api_token"]
+    options = hass.data[DOMAIN][entry.entry_id]["options"]
 
     entities = []
     for device in devices:
         for sensor_type in ["ph", "temperature", "electrical_conductivity"]:
-            entity = BluelabGuardianSensor(hass, device, sensor_type, api_token)
+            entity = BluelabGuardianSensor(hass, device, sensor_type, api_token, options)
             entities.append(entity)
 
             # Append to telemetry_entities
@@ -25,12 +26,13 @@ async def async_setup_entry(hass, entry, async_add_entities):
 class BluelabGuardianSensor(SensorEntity):
     """Representation of a Bluelab Guardian telemetry sensor."""
 
-    def __init__(self, hass, device, sensor_type, api_token):
+    def __init__(self, hass, device, sensor_type, api_token, options):
         self.hass = hass
+        self._options = options
         self.device_id = device["id"]
         self.sensor_type = sensor_type
         self.api_token = api_token
-        self._state = 0
+        self._state = None
         self._device_name = device["label"]
 
     @property
@@ -41,6 +43,11 @@ class BluelabGuardianSensor(SensorEntity):
     def state(self):
         return self._state
 
+    @property
+    def available(self):
+        """Return False until the first data has been received."""
+        return self._state is not None
+
     @property
     def name(self):
         return f"{self._device_name} {self.sensor_type.capitalize()}"
@@ -80,22 +87,29 @@ class BluelabGuardianSensor(SensorEntity):
         return SensorStateClass.MEASUREMENT
 
     def update_telemetry(self, telemetry_data):
-        """Update sensor state based on telemetry data."""
+        """Update sensor state based on telemetry data.
+
+        Returns True if the state changed and needs to be written.
+        """
         if self.sensor_type in telemetry_data:
             try:
                 # Extract the first "value" from telemetry_data for this sensor type
                 new_state = float(telemetry_data[self.sensor_type][0]["value"])  # Ensure numeric value
-                if new_state != self._state:
+                # Ignore changes within the configured deadband
+                if self._state is None or abs(new_state - self._state) > self._options[CONF_VALUE_DEADBAND]:
                     _LOGGER.debug("Updating state of %s from %s to %s", self.name, self._state, new_state)
                     self._state = new_state
-                    self.async_write_ha_state()
+                    return True
             except (ValueError, TypeError, KeyError) as e:
                 _LOGGER.error("Error updating telemetry for %s: %s", self.name, e)
+        return False
 
     def update_attributes(self, attributes_data):
         """Update attributes dynamically."""
         # Example of processing attributes if needed
+        changed = False
         for attribute in attributes_data:
             if attribute["key"] == f"{self.sensor_type}":
                 self._state = attribute["value"]
-                self.async_write_ha_state()
\ No newline at end of file
+                changed = True
+        return changed
\ No newline at end of file
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+import aiohttp
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from .const import DOMAIN, CONF_API_TOKEN, DEVICE_ATTRIBUTE_URL, THRESHOLD_SETTINGS, SERVICE_SET_THRESHOLDS, \
+    ATTR_THRESHOLDS, PROFILING_DATA, SERVICE_PROFILE, SERVICE_START_RECORDING, SERVICE_STOP_RECORDING, \
+    SERVICE_REPLAY, ATTR_SWEEPS, ATTR_FILENAME, ATTR_SPEED
+from .ingest import apply_device_attributes, apply_device_telemetry, async_write_states
+from .number import BluelabGuardianNumber
+from .profiling import SweepProfiler, TrafficRecorder, async_replay, load_recording
+
+_LOGGER = logging.getLogger(__name__)
+
+SET_THRESHOLDS_SCHEMA = vol.Schema({
+    **cv.TARGET_SERVICE_FIELDS,
+    vol.Required(ATTR_THRESHOLDS): vol.All(
+        # Same limits as the number entities
+        vol.Schema({
+            vol.Optional(setting): vol.All(vol.Coerce(float), vol.Range(min=0, max=100))
+            for setting in THRESHOLD_SETTINGS
+        }),
+        vol.Length(min=1),
+    ),
+})
+
+PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_SWEEPS, default=5): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(ATTR_FILENAME): cv.string,
+})
+
+START_RECORDING_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_FILENAME): cv.string,
+})
+
+REPLAY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_FILENAME): cv.string,
+    vol.Optional(ATTR_SPEED, default=1.0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+})
+
+
+def async_setup_services(hass: HomeAssistant):
+    """Register the Bluelab Guardian services once for all config entries."""
+    if hass.services.has_service(DOMAIN, SERVICE_SET_THRESHOLDS):
+        return
+
+    hass.data.setdefault(PROFILING_DATA, {"profiler": None, "recorder": None})
+
+    async def handle_set_thresholds(call: ServiceCall):
+        return await async_set_thresholds(hass, call)
+
+    async def handle_profile(call: ServiceCall):
+        return async_start_profile(hass, call)
+
+    async def handle_start_recording(call: ServiceCall):
+        return await async_start_recording(hass, call)
+
+    async def handle_stop_recording(call: ServiceCall):
+        return await async_stop_recording(hass)
+
+    async def handle_replay(call: ServiceCall):
+        return await async_replay_recording(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_THRESHOLDS,
+        handle_set_thresholds,
+        schema=SET_THRESHOLDS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, handle_profile, schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_RECORDING, handle_start_recording, schema=START_RECORDING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_STOP_RECORDING, handle_stop_recording,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_REPLAY, handle_replay, schema=REPLAY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def async_unload_services(hass: HomeAssistant):
+    """Remove the services once the last config entry is unloaded."""
+    for service in (
+        SERVICE_SET_THRESHOLDS, SERVICE_PROFILE, SERVICE_START_RECORDING, SERVICE_STOP_RECORDING, SERVICE_REPLAY
+    ):
+        hass.services.async_remove(DOMAIN, service)
+
+    profiling = hass.data.pop(PROFILING_DATA, None)
+    if profiling is None:
+        return
+    if profiling["profiler"] is not None:
+        profiling["profiler"].cancel()
+    if profiling["recorder"] is not None:
+        # Flush what is still buffered so the recording on disk is complete
+        records = await profiling["recorder"].async_stop()
+        _LOGGER.info("Wrote %d recorded responses to %s", records, profiling["recorder"].path)
+
+
+def _resolve_devices(hass: HomeAssistant, call: ServiceCall):
+    """Return the Edenic device IDs targeted by a service call."""
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+
+    # Expands areas, floors and labels to the devices and entities they contain
+    selected = async_extract_referenced_entity_ids(hass, call)
+    device_ids = set(selected.referenced_devices)
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        entity_entry = entity_registry.async_get(entity_id)
+        if entity_entry and entity_entry.device_id:
+            device_ids.add(entity_entry.device_id)
+
+    edenic_ids = []
+    for device_id in device_ids:
+        device = device_registry.async_get(device_id)
+        if device is None:
+            continue
+        edenic_ids.extend(identifier for domain, identifier in device.identifiers if domain == DOMAIN)
+    return edenic_ids
+
+
+async def async_set_thresholds(hass: HomeAssistant, call: ServiceCall):
+    """Send the given alarm thresholds to every targeted device with one PATCH each."""
+    thresholds = call.data[ATTR_THRESHOLDS]
+    payload = {
+        f"setting.{setting}": int(value) if setting.startswith("temp_") else round(value, 2)
+        for setting, value in thresholds.items()
+    }
+
+    # Map each Edenic device to the config entry that owns it
+    owners = {}
+    for entry_id, entry_data in hass.data.get(DOMAIN, {}).items():
+        for device in entry_data.get("devices", []):
+            owners[device["id"]] = entry_id
+
+    async def set_device(device_id):
+        entry_id = owners.get(device_id)
+        if entry_id is None:
+            return device_id, {"success": False, "error": "Device is not loaded"}
+        try:
+            await _async_patch_device(hass, entry_id, device_id, payload)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+            _LOGGER.error("Failed to set thresholds for device %s: %s", device_id, err)
+            return device_id, {"success": False, "error": str(err)}
+        return device_id, {"success": True}
+
+    # Requests run concurrently, sharing each entry's request throttle with polling
+    results = dict(await asyncio.gather(*(set_device(device_id) for device_id in _resolve_devices(hass, call))))
+    _LOGGER.debug("Threshold update results: %s", results)
+    return {"devices": results}
+
+
+async def _async_patch_device(hass: HomeAssistant, entry_id, device_id, payload):
+    """PATCH the device attributes and reflect the new thresholds on its number entities."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    api_token = hass.config_entries.async_get_entry(entry_id).data[CONF_API_TOKEN]
+    url = f"{DEVICE_ATTRIBUTE_URL}{device_id}"
+    headers = {
+        "Authorization": f"{api_token}",
+        "Content-Type": "application/json",
+    }
+
+    _LOGGER.debug("Sending PATCH request to %s with payload: %s", url, payload)
+    session = async_get_clientsession(hass)
+    async with entry_data["throttle"].slot():
+        async with session.patch(url, json=payload, headers=headers) as response:
+            response_text = await response.text()
+            if response.status != 200:
+                raise ValueError(f"Failed to set thresholds: HTTP {response.status} {response_text}")
+
+    async_write_states([
+        entity for entity in entry_data["attribute_entities"]
+        if isinstance(entity, BluelabGuardianNumber)
+        and entity.device_id == device_id
+        and f"setting.{entity.setting}" in payload
+        and entity.apply_threshold(payload[f"setting.{entity.setting}"])
+    ])
+
+
+def _resolve_path(hass: HomeAssistant, call: ServiceCall, default_name):
+    """Resolve a file name relative to the config directory and check it is allowed."""
+    filename = call.data.get(ATTR_FILENAME) or datetime.now().strftime(default_name)
+    path = os.path.abspath(hass.config.path(filename))
+    config_dir = os.path.abspath(hass.config.config_dir)
+    if os.path.commonpath([path, config_dir]) != config_dir and not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"Access to {path} is not allowed")
+    return path
+
+
+def async_start_profile(hass: HomeAssistant, call: ServiceCall):
+    """Profile the next poll sweeps and write the result as a .prof file."""
+    profiling = hass.data[PROFILING_DATA]
+    if profiling["profiler"] is not None:
+        raise HomeAssistantError(f"Profiling is already running, writing to {profiling['profiler'].path}")
+
+    path = _resolve_path(hass, call, "bluelab_guardian_%Y%m%d_%H%M%S.prof")
+    profiling["profiler"] = SweepProfiler(call.data[ATTR_SWEEPS], path)
+    _LOGGER.info("Profiling the next %d poll sweeps to %s", call.data[ATTR_SWEEPS], path)
+    return {"path": path}
+
+
+async def async_start_recording(hass: HomeAssistant, call: ServiceCall):
+    """Start recording raw API responses."""
+    profiling = hass.data[PROFILING_DATA]
+    if profiling["recorder"] is not None:
+        raise HomeAssistantError(f"Recording is already running, writing to {profiling['recorder'].path}")
+
+    path = _resolve_path(hass, call, "bluelab_guardian_%Y%m%d_%H%M%S.jsonl.gz")
+    recorder = TrafficRecorder(hass, path)
+    await recorder.async_start()
+    profiling["recorder"] = recorder
+    _LOGGER.info("Recording API traffic to %s", path)
+    return {"path": path}
+
+
+async def async_stop_recording(hass: HomeAssistant):
+    """Stop recording and write the recorded responses to disk."""
+    profiling = hass.data[PROFILING_DATA]
+    recorder = profiling["recorder"]
+    if recorder is None:
+        raise HomeAssistantError("No recording is running")
+
+    profiling["recorder"] = None
+    records = await recorder.async_stop()
+    _LOGGER.info("Wrote %d recorded responses to %s", records, recorder.path)
+    return {"path": recorder.path, "records": records}
+
+
+async def async_replay_recording(hass: HomeAssistant, call: ServiceCall):
+    """Feed a recording through the regular ingest code of the loaded entries."""
+    path = _resolve_path(hass, call, "")
+    try:
+        records = await hass.async_add_executor_job(load_recording, path)
+    except (OSError, ValueError) as err:
+        raise HomeAssistantError(f"Failed to read recording {path}: {err}") from err
+
+    def ingest(kind, device_id, data):
+        for entry_data in hass.data.get(DOMAIN, {}).values():
+            if not any(device["id"] == device_id for device in entry_data.get("devices", [])):
+                continue
+            if kind == "telemetry":
+                apply_device_telemetry(entry_data, device_id, data)
+            else:
+                apply_device_attributes(entry_data, device_id, data)
+
+    _LOGGER.info("Replaying %d recorded responses from %s at speed %s", len(records), path, call.data[ATTR_SPEED])
+    replayed = await async_replay(records, call.data[ATTR_SPEED], ingest)
+    return {"path": path, "replayed": replayed}
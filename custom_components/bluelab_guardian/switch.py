@@ -34,7 +34,7 @@ class BluelabGuardianAlarmSwitch(SwitchEntity):
         self._name = f"{device['label']} Alarm Enabled"
         self._settings = settings
         self.api_token = api_token
-        self._state = 0  # Represents whether the alarm is enabled
+        self._state = None  # Represents whether the alarm is enabled, None until known
         self._device_name = device["label"]
         self._key = "setting.alarms"  # Set the key for this entity
 
@@ -49,6 +49,11 @@ class BluelabGuardianAlarmSwitch(SwitchEntity):
         """Return the current state of the switch."""
         return self._state
 
+    @property
+    def available(self):
+        """Return False until the first data has been received."""
+        return self._state is not None
+
     @property
     def name(self):
         return self._name
@@ -64,7 +69,11 @@ class BluelabGuardianAlarmSwitch(SwitchEntity):
         }
 
     def update_attributes(self, attributes_data):
-        """Update the state of the switch based on attributes."""
+        """Update the state of the switch based on attributes.
+
+        Returns True if the state changed and needs to be written.
+        """
+        changed = False
         for attribute in attributes_data:
             if attribute["key"] == self._key:
                 try:
@@ -75,9 +84,10 @@ class BluelabGuardianAlarmSwitch(SwitchEntity):
                     if new_state != self._state:
                         _LOGGER.debug("Updating state of %s from %s to %s", self.name, self._state, new_state)
                         self._state = new_state
-                        self.async_write_ha_state()
+                        changed = True
                 except (KeyError, TypeError, AttributeError) as e:
                     _LOGGER.error("Failed to update %s: %s", self.name, e)
+        return changed
 
     async def async_turn_on(self, **kwargs):
         """Turn the alarm on."""
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+RATE_WINDOW = 60  # seconds
+
+
+class RequestThrottle:
+    """Bound concurrent Edenic API requests and keep them under a per-minute budget.
+
+    Limits can be changed with ``configure`` while requests are in flight;
+    waiting callers pick up the new limits immediately.
+    """
+
+    def __init__(self, max_concurrency, requests_per_minute):
+        self._max_concurrency = max_concurrency
+        self._requests_per_minute = requests_per_minute
+        self._active = 0
+        self._sent = deque()
+        self._condition = asyncio.Condition()
+
+    async def configure(self, max_concurrency, requests_per_minute):
+        """Apply new limits and wake up any waiting requests."""
+        async with self._condition:
+            self._max_concurrency = max_concurrency
+            self._requests_per_minute = requests_per_minute
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for a free request slot and hold it for the duration of the block."""
+        async with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= RATE_WINDOW:
+                    self._sent.popleft()
+
+                over_budget = len(self._sent) >= self._requests_per_minute
+                if not over_budget and self._active < self._max_concurrency:
+                    break
+
+                # Sleep until the oldest request leaves the window, or until woken
+                timeout = RATE_WINDOW - (now - self._sent[0]) if over_budget else None
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            self._active += 1
+            self._sent.append(now)
+
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify_all()